@@ -1,8 +1,60 @@
+import concurrent.futures
+import functools
 import itertools
+import os
 import random
-from turtle import width
 from typing import List
 
+# Offsets from a cell to its eight neighbors
+_DELTAS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+@functools.lru_cache(maxsize=None)
+def _neighbor_masks(height, width):
+    """
+    Returns the tuple of the bitmasks of the neighbors of every cell
+    of a height x width board, where cell (i, j) is bit i * width + j.
+    The mask of cell (i, j) is at index i * width + j.
+    """
+    masks = []
+    for i in range(height):
+        for j in range(width):
+            mask = 0
+            for di, dj in _DELTAS:
+                if 0 <= i + di < height and 0 <= j + dj < width:
+                    mask |= 1 << ((i + di) * width + j + dj)
+            masks.append(mask)
+    return tuple(masks)
+
+
+def _bits(mask):
+    """
+    Yields each bit set in mask, lowest first.
+    """
+    while mask:
+        bit = mask & -mask
+        yield bit
+        mask ^= bit
+
+
+def _derive(pairs):
+    """
+    Given the (mask, count) pairs of a set of sentences, returns the
+    (mask, count) pairs inferred from every two sentences where the
+    cells of one are a strict subset of the cells of the other.
+    """
+    # A subset of a sentence never has more mines than the sentence,
+    # so once sorted by count the inner loop can stop early
+    pairs = sorted(pairs, key=lambda pair: pair[1])
+    derived = []
+    for mask1, count1 in pairs:
+        for mask2, count2 in pairs:
+            if count2 > count1:
+                break
+            if (mask2 & mask1) == mask2 and mask2 != mask1:
+                derived.append((mask1 & ~mask2, count1 - count2))
+    return derived
+
 
 class Minesweeper():
     """
@@ -16,21 +68,20 @@ class Minesweeper():
         self.width = width
         self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        # Initialize an empty field with no mines,
+        # cell (i, j) is bit i * width + j of the board
+        self.board = 0
 
         # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        for index in random.sample(range(height * width), mines):
+            self.mines.add(divmod(index, width))
+            self.board |= 1 << index
+
+        # Precompute the number of mines around every cell,
+        # the count of cell (i, j) is at index i * width + j
+        self._counts = bytearray(
+            (self.board & mask).bit_count() for mask in _neighbor_masks(height, width)
+        )
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -43,7 +94,7 @@ class Minesweeper():
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self.is_mine((i, j)):
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -52,7 +103,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board >> (i * self.width + j) & 1)
 
     def nearby_mines(self, cell):
         """
@@ -61,23 +112,8 @@ class Minesweeper():
         not including the cell itself.
         """
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+        i, j = cell
+        return self._counts[i * self.width + j]
 
     def won(self):
         """
@@ -91,14 +127,48 @@ class Sentence():
     Logical statement about a Minesweeper game
     A sentence consists of a set of board cells,
     and a count of the number of those cells which are mines.
+    The cells are stored as a bitmask where cell (i, j)
+    of a board of the given width is bit i * width + j.
     """
 
-    def __init__(self, cells, count):
-        self.cells = set(cells)
+    def __init__(self, cells, count, width):
+        self.width = width
+        self.mask = 0
+        for cell in cells:
+            self.mask |= self._bit(cell)
         self.count = count
 
+    @classmethod
+    def from_mask(cls, mask, count, width):
+        """
+        Returns the sentence made of the cells set in mask.
+        """
+        sentence = cls((), count, width)
+        sentence.mask = mask
+        return sentence
+
+    @property
+    def cells(self):
+        return frozenset(
+            divmod(bit.bit_length() - 1, self.width) for bit in _bits(self.mask)
+        )
+
     def __eq__(self, other):
-        return self.cells == other.cells and self.count == other.count
+        return (self.mask == other.mask and self.count == other.count
+                and self.width == other.width)
+
+    def __hash__(self):
+        return hash((self.mask, self.count, self.width))
+
+    def _bit(self, cell):
+        """
+        Returns the bit of cell in the mask.
+        Raises ValueError if the cell is outside a board of this width.
+        """
+        i, j = cell
+        if i < 0 or not 0 <= j < self.width:
+            raise ValueError(f"cell {cell} is outside a board of width {self.width}")
+        return 1 << (i * self.width + j)
 
     def __str__(self):
         return f"{self.cells} = {self.count}"
@@ -107,13 +177,11 @@ class Sentence():
         """
         Returns the set of all cells in self.cells known to be mines.
         """
-        if len(self.cells)==self.count:
+        if self.mask.bit_count()==self.count:
             return self.cells
         else:
             return set()
 
-
-
     def known_safes(self):
         """
         Returns the set of all cells in self.cells known to be safe.
@@ -125,20 +193,23 @@ class Sentence():
 
     def mark_mine(self, cell):
         """
-        Updates internal knowledge representation given the fact that
+        Returns the sentence updated given the fact that
         a cell is known to be a mine.
         """
-        if cell in self.cells:
-            self.cells.remove(cell)
-            self.count=self.count-1
+        bit=self._bit(cell)
+        if self.mask&bit:
+            return Sentence.from_mask(self.mask&~bit,self.count-1,self.width)
+        return self
 
     def mark_safe(self, cell):
         """
-        Updates internal knowledge representation given the fact that
+        Returns the sentence updated given the fact that
         a cell is known to be safe.
         """
-        if cell in self.cells:
-            self.cells.remove(cell)
+        bit=self._bit(cell)
+        if self.mask&bit:
+            return Sentence.from_mask(self.mask&~bit,self.count,self.width)
+        return self
 
 class MinesweeperAI():
     """
@@ -158,26 +229,97 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
+        # Keep track of safe cells that have not been clicked on yet
+        self._safe_unused = set()
+
+        # List of sentences about the game known to be true,
+        # and the same sentences as a set to dedupe them
         self.knowledge = []
+        self._known_sentences = set()
+
+        # Bitmasks of the neighbors of every cell of the board
+        self._neighbor_masks = _neighbor_masks(height, width)
+
+        # All the cells of the board
+        self._all_cells = frozenset(itertools.product(range(height), range(width)))
+
+        # Bitmasks of the cells known to be safe or mines
+        self._mine_mask = 0
+        self._safe_mask = 0
 
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
-        self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self._mark({cell},set())
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
-        self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        self._mark(set(),{cell})
+
+    def _mark(self, mines, safes):
+        """
+        Marks cells as mines or safe, along with the cells of
+        every sentence that gets resolved by doing so.
+        """
+        pending=[(cell,True) for cell in mines]+[(cell,False) for cell in safes]
+        while pending:
+            cell,mine=pending.pop()
+            i,j=cell
+            bit=1<<(i*self.width+j)
+            if bit&(self._mine_mask|self._safe_mask):
+                continue
+            if mine:
+                self.mines.add(cell)
+                self._mine_mask|=bit
+            else:
+                self.safes.add(cell)
+                self._safe_mask|=bit
+                if cell not in self.moves_made:
+                    self._safe_unused.add(cell)
+            knowledge=[]
+            known_sentences=set()
+            for sentence in self.knowledge:
+                updated=sentence.mark_mine(cell) if mine else sentence.mark_safe(cell)
+                if updated is not sentence:
+                    #a resolved sentence is replaced by marking its cells
+                    m_tiles=updated.known_mines()
+                    s_tiles=updated.known_safes()
+                    if m_tiles or s_tiles:
+                        pending.extend((m,True) for m in m_tiles)
+                        pending.extend((s,False) for s in s_tiles)
+                        continue
+                #keep only non empty and different sentences
+                if updated.mask and updated not in known_sentences:
+                    knowledge.append(updated)
+                    known_sentences.add(updated)
+            self.knowledge=knowledge
+            self._known_sentences=known_sentences
+
+    def _add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base unless it is already known,
+        or marks its cells if it is enough to tell which ones are safe or mines.
+        Returns True if the knowledge base changed.
+        """
+        known_mines=sentence.mask&self._mine_mask
+        if known_mines or sentence.mask&self._safe_mask:
+            mask=sentence.mask&~(self._mine_mask|self._safe_mask)
+            sentence=Sentence.from_mask(mask,sentence.count-known_mines.bit_count(),self.width)
+        if not sentence.mask or sentence in self._known_sentences:
+            return False
+        m_tiles=sentence.known_mines()
+        s_tiles=sentence.known_safes()
+        if m_tiles or s_tiles:
+            self._mark(m_tiles,s_tiles)
+        else:
+            self.knowledge.append(sentence)
+            self._known_sentences.add(sentence)
+        return True
 
     def add_knowledge(self, cell, count):
         """
@@ -195,128 +337,28 @@ class MinesweeperAI():
                if they can be inferred from existing knowledge
         """
         self.moves_made.add(cell)
+        self._safe_unused.discard(cell)
         self.mark_safe(cell)
-        i,j=cell
-        all_moves=set()
-        for k in range(self.height):
-            for l in range(self.width):
-                all_moves.add((k,l))
-        L={(i+1,j),(i+1,j+1),(i+1,j-1),(i,j-1),(i,j+1),(i-1,j-1),(i-1,j),(i-1,j+1)}
-        neighbors=set()
-        for cell in L:
-            if cell in all_moves:
-                neighbors.add(cell)
-
         #find the possible neighbors depending on the position in the board
-        c=count
-        eliminated_cells=set()
-        for cell in neighbors:
-            if cell in self.mines:
-                eliminated_cells.add(cell)
-                c=c-1
-            if cell in self.safes:
-                eliminated_cells.add(cell)
-            if cell in self.moves_made:
-                eliminated_cells.add(cell)
-        if len(eliminated_cells)!=0:
-            for cell in eliminated_cells:
-             neighbors.remove(cell)
-        # neighbors contains now only uncertain cells
-        new_sentence=Sentence(neighbors,c)
-        #update knowledge with new sentence
-        self.knowledge.append(new_sentence)
-        new_safe_tiles=new_sentence.known_safes()
-        new_mine_tiles=new_sentence.known_mines()
-        if len(new_mine_tiles)!=0:
-            bin1=set()
-
-            for mine in new_mine_tiles:
-                bin1.add(mine)
-            for mine in bin1:
-                self.mark_mine(mine)
-        if len(new_safe_tiles)!=0:  
-            bin2=set()  
-            for safe in new_safe_tiles:
-                bin2.add(safe)
-            for safe in bin2:
-                self.mark_safe(safe)
-        
-        #mark new tiles in the new sentence as safe or mines
-         
-        for sentence in self.knowledge:
-            s_tiles=sentence.known_safes()
-            m_tiles=sentence.known_mines()
-            if len(s_tiles)!=0:
-                bin3=set()
-
-                for s in s_tiles:
-                    bin3.add(s)
-                for s in bin3:
-                    self.mark_safe(s)
-            if len(m_tiles)!=0:
-                bin4=set()
-
-                for m in m_tiles:
-                    bin4.add(m)
-                for m in bin4:
-                    self.mark_mine(m)
-        #new tiles discovered to be safe or mines as a consequence of marking the new tiles
-        for sentence in self.knowledge:
-            if len(sentence.cells)==0:
-                self.knowledge.remove(sentence)
-
-        #new inference that we can make
-        additional_knowledge=[]
-        for sentence1 in self.knowledge:
-            cells1=sentence1.cells
-            for sentence2 in self.knowledge:
-                if not sentence2.__eq__(sentence1):
-                    cells2=sentence2.cells
-                    if cells2.issubset(cells1):
-                        cells3=cells1.difference(cells2)
-                        count3=sentence1.count-sentence2.count
-                        sentence3=Sentence(cells3,count3)
-                        additional_knowledge.append(sentence3)
-        #add only different new sentences                
-        if len(additional_knowledge)!=0:
+        i,j=cell
+        neighbors=self._neighbor_masks[i*self.width+j]
+        new_sentence=Sentence.from_mask(neighbors,count,self.width)
+        #update knowledge with new sentence,
+        #known mines and safes are taken out of it when it is added
+        self._add_sentence(new_sentence)
+
+        #keep inferring new sentences until nothing changes
+        changed=True
+        while changed:
+            changed=False
+
+            #new inference that we can make
+            pairs=[(sentence.mask,sentence.count) for sentence in self.knowledge]
+            additional_knowledge=[Sentence.from_mask(mask,count,self.width) for mask,count in _derive(pairs)]
+            #add only different new sentences
             for sentence in additional_knowledge:
-                if sentence not in self.knowledge:
-                  self.knowledge.append(sentence)
-        #add only non empty sentences
-        for sentence in self.knowledge:
-            if len(sentence.cells)==0:
-                self.knowledge.remove(sentence)
-
-        #based one the additional inferences, maybe some tiles were discovered to be mines or safe
-        for sentence in additional_knowledge:
-              if len(sentence.cells)==0:
-                additional_knowledge.remove(sentence)
-        #Draw new conclusions from new statements added
-        for sentence in additional_knowledge:
-            s_tiles2=sentence.known_safes()
-            m_tiles2=sentence.known_mines()
-            if len(s_tiles2)!=0:
-                bin5=set()
-                for s in s_tiles2:
-                    bin5.add(s)
-                for s in bin5:
-                    self.mark_safe(s)
-            if len(m_tiles2)!=0:
-                bin6=set()
-                for m in m_tiles2:
-                    bin6.add(m)
-                for m in bin6:
-                    self.mark_mine(m)
-
-
-       
-            
-            
-            
-
-
-
-
+                if self._add_sentence(sentence):
+                    changed=True
 
     def make_safe_move(self):
         """
@@ -327,13 +369,7 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-
-        if len(self.safes)!=0:
-            for cell in self.safes:
-                if cell not in self.moves_made:
-                    return cell
-            
-        return None
+        return next(iter(self._safe_unused),None)
 
     def make_random_move(self):
         """
@@ -342,18 +378,52 @@ class MinesweeperAI():
             1) have not already been chosen, and
             2) are not known to be mines
         """
-        
-        all_moves=set()
-        for i in range(self.height-1):
-            for j in range(self.width-1):
-                all_moves.add((i,j))
-        impossible_moves=self.moves_made.union(self.mines)
-        possible_move=all_moves.difference(impossible_moves)
+
+        possible_move=self._all_cells-self.moves_made-self.mines
         if len(possible_move)!=0:
-            L=list(possible_move)
-            i=random.randint(0,len(L)-1)
-            return L[i]
+            return random.choice(tuple(possible_move))
         else:
             return None
-        
 
+
+def simulate(seed, height=8, width=8, mines=8):
+    """
+    Plays a full game with the AI on a board generated from seed.
+    Returns True if the AI won. The state of the random module
+    is restored afterwards, so the caller's random sequence is kept.
+    """
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        game = Minesweeper(height=height, width=width, mines=mines)
+        ai = MinesweeperAI(height=height, width=width)
+        while True:
+            move = ai.make_safe_move()
+            if move is None:
+                move = ai.make_random_move()
+            if move is None:
+                game.mines_found = set(ai.mines)
+                return game.won()
+            if game.is_mine(move):
+                return False
+            ai.add_knowledge(move, game.nearby_mines(move))
+    finally:
+        random.setstate(state)
+
+
+def run_games(n, **config):
+    """
+    Plays n games with the AI, spread over one process per core.
+    Game k is generated from seed k, and config is passed on to
+    simulate. Returns the list of results.
+
+    Games are sent to the workers in chunks, since a single game is
+    too short to be worth its own round-trip between processes.
+    On platforms that start workers with spawn (Windows, macOS),
+    call this under `if __name__ == "__main__":`.
+    """
+    chunksize = max(1, n // (4 * (os.cpu_count() or 1)))
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        return list(executor.map(
+            functools.partial(simulate, **config), range(n), chunksize=chunksize
+        ))